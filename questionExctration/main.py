@@ -2,16 +2,193 @@ import fitz
 import re
 import os
 import json
-from typing import List, Dict, Optional
+import logging
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usamos o json padrão
+    orjson = None
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick é opcional; sem ele a busca usa o re padrão
+    ahocorasick = None
+
+# Numba só é carregado se pedido (EXTRATOR_NUMBA=1): importá-lo e carregar o JIT
+# custa mais do que a busca por símbolos economiza num vestibular inteiro
+njit = None
+if os.environ.get("EXTRATOR_NUMBA"):
+    try:
+        import numpy as np
+        from numba import njit
+    except ImportError:  # numba/numpy são opcionais; sem eles a busca é feita em Python
+        njit = None
+
+# Progresso por página/questão/imagem; silencioso por padrão (ver bloco __main__)
+logger = logging.getLogger(__name__)
+
+# Padrões compilados uma única vez no carregamento do módulo
+_RE_LINHA = re.compile(r'l\.\s*\d+')
+
+# Marcadores de uma questão, reconhecidos numa única varredura do texto
+_TOKENS_ESTRUTURA = (
+    r'(?P<INSTRUCAO>(?:Instrução|INSTRUÇÃO):)'
+    r'|(?P<MARCADOR>\([A-FV]\))'
+)
+# Fórmulas ficam num lookahead: não consomem texto, então nunca escondem um
+# marcador ou rótulo e podem se sobrepor a outras fórmulas
+_RE_TOKENS = re.compile(
+    _TOKENS_ESTRUTURA +
+    r'|(?=(?P<FRAC>\\frac\{.+?\}\{.+?\})|(?P<SQRT>\\sqrt\{.+?\})'
+    r'|(?P<INTEGRAL>∫.+?d[xyz])|(?P<POTENCIA>\b[a-z]\^[0-9]))'
+)
+
+# Matérias sem fórmulas nem cálculo esperados varrem só a estrutura
+_RE_TOKENS_ESTRUTURA = re.compile(_TOKENS_ESTRUTURA)
+
+# Palavras que indicam referência a uma imagem no texto da questão
+_PALAVRAS_IMAGEM = ('figura', 'imagem', 'gráfico', 'tabela', 'diagrama', 'ilustração', 'quadro', 'mapa', 'inf', 'chart')
+
+if ahocorasick is not None:
+    # Autômato com todas as palavras, percorrido uma única vez sobre o texto
+    _AUTOMATO_IMAGEM = ahocorasick.Automaton()
+    for palavra in _PALAVRAS_IMAGEM:
+        _AUTOMATO_IMAGEM.add_word(palavra, palavra)
+    _AUTOMATO_IMAGEM.make_automaton()
+    
+    # str.lower() só diverge do re.IGNORECASE nestas letras ('İ'.lower() vira
+    # dois caracteres; 'ı' e 'ſ' não têm minúscula), então são trocadas antes
+    _EQUIVALENTES_IGNORECASE = str.maketrans({'İ': 'i', 'ı': 'i', 'ſ': 's'})
+else:
+    _RE_IMG_REF = re.compile('|'.join(_PALAVRAS_IMAGEM), re.IGNORECASE)
+
+def _tem_referencia_imagem(texto: str) -> bool:
+    """Indica se o texto menciona figura, gráfico, tabela etc."""
+    if ahocorasick is not None:
+        # Para na primeira ocorrência encontrada
+        for _ in _AUTOMATO_IMAGEM.iter(texto.translate(_EQUIVALENTES_IGNORECASE).lower()):
+            return True
+        return False
+    
+    return bool(_RE_IMG_REF.search(texto))
+
+# Símbolos que caracterizam uma questão de cálculo
+_SIMBOLOS_CALCULO = frozenset('∫∑∏√±×÷≤≥≠∞')
+
+if njit is not None:
+    # Tabela indexada pelo código do caractere (todos os símbolos estão abaixo de U+3000)
+    _TABELA_CALCULO = np.zeros(0x3000, dtype=np.bool_)
+    _TABELA_CALCULO[[ord(c) for c in _SIMBOLOS_CALCULO]] = True
+    
+    @njit(cache=True)
+    def _varrer_simbolos(codigos, tabela):
+        for c in codigos:
+            if c < tabela.shape[0] and tabela[c]:
+                return True
+        return False
+
+def _tem_simbolo_calculo(texto: str) -> bool:
+    """Indica se o texto contém símbolos ou notação de cálculo"""
+    if 'frac' in texto or 'sqrt' in texto or '^' in texto:
+        return True
+    
+    if njit is not None:
+        codigos = np.frombuffer(texto.encode('utf-32-le'), dtype=np.uint32)
+        return _varrer_simbolos(codigos, _TABELA_CALCULO)
+    
+    return not _SIMBOLOS_CALCULO.isdisjoint(texto)
+
+# Matérias em que fórmulas e símbolos de cálculo são procurados
+_MATERIAS_EXATAS = {"Matemática", "Física", "Química", "Biologia"}
+
+_MATERIAS = {
+    "PORTUGUÊS": "Português",
+    "LITERATURA": "Literatura",
+    "MATEMÁTICA": "Matemática",
+    "FÍSICA": "Física",
+    "QUÍMICA": "Química",
+    "HISTÓRIA": "História",
+    "GEOGRAFIA": "Geografia",
+    "BIOLOGIA": "Biologia",
+}
+_NOMES_MATERIAS = frozenset(_MATERIAS.values())
+# Uma única alternação com grupos nomeados: o nome do grupo que casou indica a matéria
+_RE_MATERIA = re.compile(
+    '|'.join(rf'\b(?P<{keyword}>{keyword})\b' for keyword in _MATERIAS),
+    re.IGNORECASE
+)
+
+# Só o texto bruto é consumido: dispensa a preservação de ligaduras do modo "text"
+# (espaços, recorte pela página e caracteres sem unicode seguem como no padrão)
+_FLAGS_TEXTO = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES
+
+# Documento aberto por cada processo de trabalho, reaproveitado entre páginas
+_doc_processo = None
+
+def _iniciar_processo(dados: bytes):
+    """Inicializa o processo de trabalho abrindo o PDF a partir dos bytes lidos pelo processo principal"""
+    global _doc_processo
+    _doc_processo = fitz.open(stream=dados, filetype="pdf")
+
+def _extrair_pagina(page_num: int, doc: Optional[fitz.Document] = None) -> Tuple[Optional[str], List[Dict]]:
+    """Extrai texto e referências às imagens de uma página; executada nos processos de trabalho"""
+    if doc is None:
+        doc = _doc_processo
+    
+    texto_pagina = None
+    imagens = []
+    
+    try:
+        page = doc[page_num]
+        texto_pagina = page.get_text("text", flags=_FLAGS_TEXTO)
+    except Exception as e:
+        logger.warning("Erro ao processar página %s: %s", page_num, e)
+        return texto_pagina, imagens
+    
+    try:
+        image_list = page.get_images()
+        
+        for img_index, img in enumerate(image_list):
+            xref = img[0]
+            try:
+                rects = page.get_image_rects(xref)
+                
+                # Só a referência: os bytes são extraídos e salvos quando
+                # alguma questão usar a imagem (ver _salvar_imagem)
+                imagens.append({
+                    "xref": xref,
+                    "pagina": page_num,
+                    "index": img_index,
+                    "bbox": rects[0] if rects else None
+                })
+            except Exception as e:
+                logger.warning("Erro ao extrair imagem %s da página %s: %s", img_index, page_num, e)
+                continue
+                
+    except Exception as e:
+        logger.warning("Erro ao processar imagens da página %s: %s", page_num, e)
+    
+    return texto_pagina, imagens
 
 class ExtractorUFRGS:
     def __init__(self, pdf_path: str):
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF não encontrado: {pdf_path}")
-        self.doc = fitz.open(pdf_path)
+        # Bytes lidos uma única vez: abrem o documento aqui e nos processos de trabalho
+        with open(pdf_path, 'rb') as f:
+            self.pdf_bytes = f.read()
+        self.doc = fitz.open(stream=self.pdf_bytes, filetype="pdf")
         self.questoes = []
+        self.contagem_por_materia = Counter()  # atualizadas durante a extração
+        self.total_com_imagem = 0
         self.materia_atual = None
         self.imagens_por_pagina = {}
+        self.paginas_com_imagem = []  # ordenadas, para busca binária
+        self.imagens_salvas = {}  # xref -> arquivo já gravado em disco
         self.pasta_imagens = "imagens_questoes"
         self._criar_pasta_imagens()
         
@@ -22,130 +199,101 @@ class ExtractorUFRGS:
     def extrair_todas_questoes(self) -> List[Dict]:
         """Extrai todas as questões do vestibular"""
         
-        # Primeira passagem: extrair todas as imagens
-        self._extrair_todas_imagens()
-        
-        texto_completo = ""
-        
-        # Segunda passagem: extrair texto com marcadores de matéria e página
-        for page_num in range(len(self.doc)):
-            try:
-                page = self.doc[page_num]
-                texto_pagina = page.get_text("text")
-                
-                # Detectar matéria
-                self._detectar_materia(texto_pagina)
-                
-                # Adicionar marcador de página
-                texto_completo += f"\n[PAGINA:{page_num}]\n"
-                
-                # Adicionar marcador de matéria
-                if self.materia_atual:
-                    texto_completo += f"[MATERIA:{self.materia_atual}]\n"
-                
-                texto_completo += texto_pagina
-            except Exception as e:
-                print(f"Erro ao processar página {page_num}: {e}")
+        # Contagens refletem só esta extração, assim como self.questoes
+        self.contagem_por_materia = Counter()
+        self.total_com_imagem = 0
+        
+        # Trechos acumulados em lista e unidos no final (evita cópias a cada +=)
+        partes = []
+        
+        # Páginas são independentes e podem ser extraídas em paralelo, mas só se
+        # pedido (EXTRATOR_PROCESSOS=N): num vestibular típico subir os processos e
+        # reabrir o PDF em cada um custa mais do que extrair as páginas aqui mesmo
+        num_paginas = len(self.doc)
+        processos = os.environ.get("EXTRATOR_PROCESSOS", "")
+        max_workers = min(int(processos), num_paginas) if processos.isdecimal() else 1
+        if max_workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_iniciar_processo,
+                initargs=(self.pdf_bytes,)
+            ) as executor:
+                resultados = list(executor.map(_extrair_pagina, range(num_paginas), chunksize=4))
+        else:
+            # Usa o documento já aberto; resultados na ordem das páginas
+            resultados = [_extrair_pagina(page_num, self.doc) for page_num in range(num_paginas)]
+        
+        for page_num, (texto_pagina, imagens) in enumerate(resultados):
+            self.imagens_por_pagina[page_num] = imagens
+            
+            if texto_pagina is None:
                 continue
+            
+            # Detectar matéria
+            self._detectar_materia(texto_pagina)
+            
+            # Adicionar marcador de página
+            partes.append(f"\n[PAGINA:{page_num}]\n")
+            
+            # Adicionar marcador de matéria
+            if self.materia_atual:
+                partes.append(f"[MATERIA:{self.materia_atual}]\n")
+            
+            partes.append(texto_pagina)
+        
+        texto_completo = ''.join(partes)
+        self.paginas_com_imagem = sorted(p for p, imagens in self.imagens_por_pagina.items() if imagens)
         
         # Processar todo o texto de uma vez
         if texto_completo:
             self.questoes = self._processar_texto_completo(texto_completo)
         
-        # Filtrar questões vazias
-        self.questoes = [q for q in self.questoes if q['enunciado'].strip()]
-        
         # Ordenar por número de questão
         self.questoes.sort(key=lambda q: q['numero'])
         
         return self.questoes
     
-    def _extrair_todas_imagens(self):
-        """Extrai todas as imagens do PDF com seus dados de posição"""
-        for page_num in range(len(self.doc)):
-            try:
-                page = self.doc[page_num]
-                image_list = page.get_images()
-                
-                self.imagens_por_pagina[page_num] = []
-                
-                for img_index, img in enumerate(image_list):
-                    xref = img[0]
-                    try:
-                        base_image = self.doc.extract_image(xref)
-                        rects = page.get_image_rects(xref)
-                        
-                        # Salvar imagem em arquivo
-                        filename = f"pag{page_num}_img{img_index}.{base_image['ext']}"
-                        filepath = os.path.join(self.pasta_imagens, filename)
-                        
-                        with open(filepath, 'wb') as f:
-                            f.write(base_image["image"])
-                        
-                        # Armazenar informações da imagem
-                        self.imagens_por_pagina[page_num].append({
-                            "arquivo": filename,
-                            "caminho": filepath,
-                            "pagina": page_num,
-                            "index": img_index,
-                            "bbox": rects[0] if rects else None,
-                            "formato": base_image["ext"]
-                        })
-                        
-                        print(f"✓ Imagem extraída: {filename}")
-                    except Exception as e:
-                        print(f"Erro ao extrair imagem {img_index} da página {page_num}: {e}")
-                        continue
-                        
-            except Exception as e:
-                print(f"Erro ao processar imagens da página {page_num}: {e}")
-                continue
-    
     def _detectar_materia(self, texto: str):
         """Detecta a matéria no texto da página"""
-        materias = {
-            "PORTUGUÊS": "Português",
-            "LITERATURA": "Literatura",
-            "MATEMÁTICA": "Matemática",
-            "FÍSICA": "Física",
-            "QUÍMICA": "Química",
-            "HISTÓRIA": "História",
-            "GEOGRAFIA": "Geografia",
-            "BIOLOGIA": "Biologia",
-        }
-        
-        for keyword, materia in materias.items():
-            if re.search(rf'\b{keyword}\b', texto, re.IGNORECASE):
-                self.materia_atual = materia
-                break
+        match = _RE_MATERIA.search(texto)
+        if match:
+            self.materia_atual = _MATERIAS[match.lastgroup]
     
     def _processar_texto_completo(self, texto: str) -> List[Dict]:
         """Processa o texto completo e extrai questões - VERSÃO MELHORADA"""
         questoes = []
+        linhas = texto.split('\n')
+        
+        # Uma única passagem pelas linhas: localiza os inícios de questão e
+        # acompanha os marcadores de página e matéria vigentes em cada um
+        inicios = []
+        pagina = None
+        materia = self.materia_atual
+        for idx, linha in enumerate(linhas):
+            # Só linhas idênticas aos marcadores gerados; texto do PDF parecido é ignorado
+            if linha.startswith('[PAGINA:') and linha.endswith(']') and linha[8:-1].isdecimal():
+                pagina = int(linha[8:-1])
+                continue
+            if linha.startswith('[MATERIA:') and linha.endswith(']') and linha[9:-1] in _NOMES_MATERIAS:
+                materia = linha[9:-1]
+                continue
+            
+            inicio = self._inicio_questao(linha)
+            # Linha sem texto após o ponto só conta se houver uma quebra depois dela
+            if idx > 0 and inicio and (inicio[1] or idx + 1 < len(linhas)):
+                inicios.append((idx, inicio[0], inicio[1], pagina, materia))
         
-        # Padrão MELHORADO: captura número de questão seguido de ponto e espaço/quebra
-        # Usa lookahead para não consumir o próximo número
-        padrao_questao = r'\n\s*(\d{1,3})\s*\.\s+(.+?)(?=\n\s*\d{1,3}\s*\.\s+|\Z)'
-        
-        matches = list(re.finditer(padrao_questao, texto, re.DOTALL))
-        
-        print(f"✓ {len(matches)} questões encontradas")
+        logger.info("✓ %s questões encontradas", len(inicios))
         
-        for i, match in enumerate(matches):
-            numero = int(match.group(1))
-            texto_questao = match.group(2).strip()
-            
-            # Extrair matéria e página do contexto anterior ao número
-            inicio_match = match.start()
-            contexto_anterior = texto[max(0, inicio_match-500):inicio_match]
-            
-            materia = self._extrair_materia_contexto(contexto_anterior)
-            pagina = self._extrair_pagina_contexto(contexto_anterior)
+        for i, (idx, numero, resto, pagina, materia) in enumerate(inicios):
+            # A questão vai até a linha em que começa a próxima
+            fim = inicios[i + 1][0] if i + 1 < len(inicios) else len(linhas)
+            texto_questao = '\n'.join([resto] + linhas[idx + 1:fim]).strip()
             
             # Obter o número da próxima questão
             proxima_questao_num = None
-            if i + 1 < len(matches):
-                proxima_questao_num = int(matches[i + 1].group(1))
+            if i + 1 < len(inicios):
+                proxima_questao_num = inicios[i + 1][1]
             
             if texto_questao and len(texto_questao) > 5: # Reduz limite mínimo
                 questao = self._estruturar_questao(
@@ -155,179 +303,296 @@ class ExtractorUFRGS:
                     pagina,
                     proxima_questao_num
                 )
+                
+                # Descartar questões com enunciado vazio
+                if not questao['enunciado'].strip():
+                    continue
+                
                 questoes.append(questao)
-                print(f"  Questão {numero} extraída ({materia})")
+                self.contagem_por_materia[materia] += 1
+                if questao['tem_imagem']:
+                    self.total_com_imagem += 1
+                logger.info("  Questão %s extraída (%s)", numero, materia)
         
         return questoes
     
-    def _extrair_materia_contexto(self, contexto: str) -> Optional[str]:
-        """Extrai matéria do contexto anterior"""
-        materias = {
-            "PORTUGUÊS": "Português",
-            "LITERATURA": "Literatura",
-            "MATEMÁTICA": "Matemática",
-            "FÍSICA": "Física",
-            "QUÍMICA": "Química",
-            "HISTÓRIA": "História",
-            "GEOGRAFIA": "Geografia",
-            "BIOLOGIA": "Biologia",
-        }
-        
-        # Procura pela matéria mais recente no contexto
-        for keyword, materia in materias.items():
-            if re.search(rf'\b{keyword}\b', contexto, re.IGNORECASE):
-                return materia
-        
-        return self.materia_atual
-    
-    def _extrair_pagina_contexto(self, contexto: str) -> Optional[int]:
-        """Extrai número da página do contexto"""
-        match = re.search(r'\[PAGINA:(\d+)\]', contexto)
-        return int(match.group(1)) if match else None
+    def _inicio_questao(self, linha: str) -> Optional[tuple]:
+        """Reconhece linhas no formato '<número>. texto', retornando (número, resto da linha)"""
+        s = linha.lstrip()
+        
+        # Número de 1 a 3 dígitos
+        n = 0
+        while n < len(s) and n < 4 and s[n].isdecimal():
+            n += 1
+        if not 1 <= n <= 3:
+            return None
+        
+        # Seguido de ponto e de espaço ou fim de linha
+        resto = s[n:].lstrip()
+        if not resto.startswith('.'):
+            return None
+        resto = resto[1:]
+        if resto and not resto[0].isspace():
+            return None
+        
+        return int(s[:n]), resto
     
     def _estruturar_questao(self, numero: int, texto: str, materia: str, pagina: Optional[int], proxima_questao: Optional[int]) -> Dict:
         """Estrutura uma questão individual"""
         
-        enunciado = self._extrair_enunciado(texto)
-        alternativas = self._extrair_alternativas(texto)
-        tipo = self._classificar_tipo_questao(texto)
+        # Fórmulas e cálculo só são procurados em exatas (ou matéria desconhecida)
+        exatas = materia is None or materia in _MATERIAS_EXATAS
+        
+        # Uma única varredura alimenta todos os campos da questão
+        varredura = self._varrer_questao(texto, exatas)
+        
+        enunciado = self._extrair_enunciado(texto, varredura)
+        alternativas = self._extrair_alternativas(texto, varredura)
+        tipo = self._classificar_tipo_questao(texto, varredura, exatas)
         
         # Detectar imagens relacionadas
-        imagens_relacionadas = self._encontrar_imagens_por_numero(numero, texto, pagina, proxima_questao)
+        imagens_relacionadas = self._encontrar_imagens_por_numero(numero, _tem_referencia_imagem(texto), pagina, proxima_questao)
         tem_imagem = len(imagens_relacionadas) > 0
         
         questao = {
             "numero": numero,
             "materia": materia,
-            "instrucao": self._extrair_instrucao(texto),
+            "instrucao": self._extrair_instrucao(texto, varredura),
             "enunciado": enunciado,
             "alternativas": alternativas,
             "tipo": tipo,
             "tem_imagem": tem_imagem,
             "imagens": imagens_relacionadas,
-            "formulas": self._extrair_formulas(texto)
+            "formulas": self._extrair_formulas(varredura)
         }
         
         return questao
     
-    def _encontrar_imagens_por_numero(self, numero_questao: int, texto_questao: str, pagina_atual: Optional[int], proxima_questao: Optional[int]) -> List[Dict]:
+    def _varrer_questao(self, texto: str, com_formulas: bool = True) -> Dict:
+        """Percorre o texto da questão uma única vez, classificando os marcadores encontrados"""
+        varredura = {
+            "instrucoes": [],       # (inicio, fim) de cada bloco de instrução
+            "marcadores": [],       # (letra, inicio, fim) de cada (A) a (F)
+            "formulas": set(),
+            "verdadeiro_falso": False,
+        }
+        
+        # Fim da última ocorrência de cada tipo de fórmula: o mesmo tipo não se sobrepõe
+        fim_formulas = {}
+        
+        padrao = _RE_TOKENS if com_formulas else _RE_TOKENS_ESTRUTURA
+        for match in padrao.finditer(texto):
+            token = match.lastgroup
+            
+            if token == "MARCADOR":
+                letra = match.group()[1]
+                if letra in "VF":
+                    varredura["verdadeiro_falso"] = True
+                if letra != "V":
+                    varredura["marcadores"].append((letra, match.start(), match.end()))
+            elif token == "INSTRUCAO":
+                instrucoes = varredura["instrucoes"]
+                # Rótulo dentro de um bloco já registrado faz parte dele
+                if instrucoes and match.start() < instrucoes[-1][1]:
+                    continue
+                # O bloco vai até a primeira linha iniciada por "(" ou até o fim
+                fim = texto.find('\n(', match.end())
+                instrucoes.append((match.start(), fim if fim != -1 else len(texto)))
+            elif match.start(token) >= fim_formulas.get(token, 0):
+                varredura["formulas"].add(match.group(token))
+                fim_formulas[token] = match.end(token)
+        
+        return varredura
+    
+    def _encontrar_imagens_por_numero(self, numero_questao: int, tem_referencia_imagem: bool, pagina_atual: Optional[int], proxima_questao: Optional[int]) -> List[Dict]:
         """
         Encontra imagens ENTRE a questão atual e a próxima
         """
         imagens_proximas = []
         
-        # 1. Verificar se há referência a imagem no texto
-        tem_referencia_imagem = bool(re.search(
-            r'figura|imagem|gráfico|tabela|diagrama|ilustração|quadro|mapa|inf|chart',
-            texto_questao,
-            re.IGNORECASE
-        ))
-        
-        # Se não tem referência, retorna vazio
+        # Se não há referência a imagem no texto, retorna vazio
         if not tem_referencia_imagem:
             return []
         
-        # 2. Se tem referência e temos página, procura imagens próximas
+        # Se tem referência e temos página, procura imagens próximas
         if pagina_atual is not None:
-            # Procura na mesma página e páginas seguintes (até a próxima questão)
-            for offset in range(0, 5):
-                pagina_busca = pagina_atual + offset
+            # Procura na mesma página e até 4 páginas seguintes, partindo direto
+            # da primeira página com imagens a partir da atual
+            inicio = bisect_left(self.paginas_com_imagem, pagina_atual)
+            for pagina_busca in self.paginas_com_imagem[inicio:]:
+                if pagina_busca > pagina_atual + 4:
+                    break
                 
-                if pagina_busca in self.imagens_por_pagina:
-                    for img in self.imagens_por_pagina[pagina_busca]:
+                for img in self.imagens_por_pagina[pagina_busca]:
+                    salva = self._salvar_imagem(img)
+                    if salva:
                         imagens_proximas.append({
-                            "arquivo": img["arquivo"],
-                            "caminho": img["caminho"],
-                            "pagina": img["pagina"],
-                            "formato": img["formato"]
+                            "arquivo": salva["arquivo"],
+                            "caminho": salva["caminho"],
+                            "pagina": salva["pagina"],
+                            "formato": salva["formato"]
                         })
                     
-                    # Retorna logo após encontrar primeira página com imagens
-                    if imagens_proximas:
+                    # No máximo 2 imagens: as demais nem chegam a ser salvas
+                    if len(imagens_proximas) == 2:
                         break
+                
+                # Retorna logo após encontrar primeira página com imagens
+                if imagens_proximas:
+                    break
+        
+        return imagens_proximas
+    
+    def _salvar_imagem(self, img: Dict) -> Optional[Dict]:
+        """Extrai a imagem do PDF e grava em arquivo na primeira vez que é usada"""
+        xref = img["xref"]
+        if xref in self.imagens_salvas:
+            return self.imagens_salvas[xref]
+        
+        try:
+            base_image = self.doc.extract_image(xref)
+            
+            # Salvar imagem em arquivo
+            filename = f"pag{img['pagina']}_img{img['index']}.{base_image['ext']}"
+            filepath = os.path.join(self.pasta_imagens, filename)
+            
+            with open(filepath, 'wb') as f:
+                f.write(base_image["image"])
+            
+            # A página acompanha o arquivo: um xref repetido em outras páginas
+            # reaproveita este arquivo e continua apontando para onde foi salvo
+            salva = {
+                "arquivo": filename,
+                "caminho": filepath,
+                "pagina": img["pagina"],
+                "formato": base_image["ext"]
+            }
+            logger.info("✓ Imagem extraída: %s", filename)
+        except Exception as e:
+            logger.warning("Erro ao extrair imagem %s da página %s: %s", img['index'], img['pagina'], e)
+            salva = None
         
-        # Retorna no máximo 2 imagens
-        return imagens_proximas[:2] if imagens_proximas else []
+        self.imagens_salvas[xref] = salva
+        return salva
     
-    def _extrair_instrucao(self, texto: str) -> Optional[str]:
+    def _extrair_instrucao(self, texto: str, varredura: Dict) -> Optional[str]:
         """Extrai instrução se houver"""
-        match = re.search(
-            r'(?:Instrução|INSTRUÇÃO):\s*(.+?)(?=\n\(|$)',
-            texto,
-            re.DOTALL
-        )
-        return match.group(1).strip() if match else None
+        if not varredura["instrucoes"]:
+            return None
+        
+        # O rótulo ("Instrução:" ou "INSTRUÇÃO:") precisa de ao menos um caractere depois
+        fim_rotulo = texto.index(':', varredura["instrucoes"][0][0]) + 1
+        if fim_rotulo >= len(texto):
+            return None
+        
+        # Pula os espaços após o rótulo; o conteúdo vai até a próxima linha iniciada
+        # por "(" (a pelo menos um caractere de distância) ou até o fim
+        inicio = len(texto) - len(texto[fim_rotulo:].lstrip())
+        inicio = min(inicio, len(texto) - 1)
+        fim = texto.find('\n(', inicio + 1)
+        return texto[inicio:fim if fim != -1 else len(texto)].strip()
     
-    def _extrair_enunciado(self, texto: str) -> str:
+    def _extrair_enunciado(self, texto: str, varredura: Dict) -> str:
         """Extrai o enunciado principal"""
-        texto_limpo = re.sub(
-            r'(?:Instrução|INSTRUÇÃO):.*?(?=\n\(|$)',
-            '',
-            texto,
-            flags=re.DOTALL
-        )
-        
-        match = re.search(r'^(.+?)\n\s*\([A-E]\)', texto_limpo, re.DOTALL)
-        
-        if match:
-            enunciado = match.group(1).strip()
-            enunciado = re.sub(r'l\.\s*\d+', '', enunciado)
-            return enunciado
+        instrucoes = varredura["instrucoes"]
+        
+        # Texto sem os blocos de instrução
+        partes = []
+        posicao = 0
+        for inicio, fim in instrucoes:
+            partes.append(texto[posicao:inicio])
+            posicao = fim
+        partes.append(texto[posicao:])
+        texto_limpo = ''.join(partes)
+        
+        # O enunciado termina na primeira alternativa (A) a (E) que abre uma linha,
+        # desde que haja ao menos um caractere antes dessa quebra de linha
+        for letra, inicio, _ in varredura["marcadores"]:
+            if letra == "F":
+                continue
+            
+            # Converte a posição para o texto limpo, ignorando marcadores removidos
+            removido = 0
+            dentro_instrucao = False
+            for a, b in instrucoes:
+                if b <= inicio:
+                    removido += b - a
+                elif a <= inicio:
+                    dentro_instrucao = True
+                    break
+                else:
+                    break
+            if dentro_instrucao:
+                continue
+            
+            corte = inicio - removido
+            anterior = texto_limpo[:corte]
+            inicio_espacos = len(anterior.rstrip())
+            if '\n' in texto_limpo[max(inicio_espacos, 1):corte]:
+                return _RE_LINHA.sub('', anterior.strip())
         
         return texto_limpo.strip()
     
-    def _extrair_alternativas(self, texto: str) -> List[Dict]:
+    def _extrair_alternativas(self, texto: str, varredura: Dict) -> List[Dict]:
         """Extrai alternativas (A) a (E)"""
         alternativas = []
+        marcadores = varredura["marcadores"]
         
-        padrao = r'\(([A-E])\)\s*(.+?)(?=\([A-F]\)|$)'
-        matches = re.finditer(padrao, texto, re.DOTALL)
-        
-        for match in matches:
-            letra = match.group(1)
-            conteudo = match.group(2).strip()
-            conteudo = ' '.join(conteudo.split())
+        i = 0
+        while i < len(marcadores):
+            letra, _, fim = marcadores[i]
+            if letra == "F":
+                i += 1
+                continue
+            
+            # O conteúdo começa após os espaços e tem ao menos um caractere, então
+            # um marcador colado ao início faz parte dele
+            inicio = len(texto) - len(texto[fim:].lstrip())
+            if inicio >= len(texto):
+                break
+            
+            # Vai até o próximo (A) a (F) ou até o fim
+            proximo = i + 1
+            while proximo < len(marcadores) and marcadores[proximo][1] <= inicio:
+                proximo += 1
+            fim_conteudo = marcadores[proximo][1] if proximo < len(marcadores) else len(texto)
+            conteudo = ' '.join(texto[inicio:fim_conteudo].split())
             
             if conteudo:
                 alternativas.append({
                     "letra": letra,
                     "texto": conteudo
                 })
+            
+            i = proximo
         
         return alternativas
     
-    def _classificar_tipo_questao(self, texto: str) -> str:
+    def _classificar_tipo_questao(self, texto: str, varredura: Dict, exatas: bool = True) -> str:
         """Classifica o tipo da questão"""
-        if re.search(r'\([VF]\)', texto):
+        if varredura["verdadeiro_falso"]:
             return "verdadeiro_falso"
-        elif re.search(r'[∫∑∏√±×÷≤≥≠∞]|frac|sqrt|\^', texto):
+        elif exatas and _tem_simbolo_calculo(texto):
             return "calculo"
         elif len(texto) > 800:
             return "interpretacao_texto"
         
         return "multipla_escolha"
     
-    def _extrair_formulas(self, texto: str) -> List[str]:
+    def _extrair_formulas(self, varredura: Dict) -> List[str]:
         """Extrai fórmulas matemáticas"""
-        formulas = []
-        patterns = [
-            r'\b[a-z]\^[0-9]',
-            r'\\frac\{.+?\}\{.+?\}',
-            r'\\sqrt\{.+?\}',
-            r'∫.+?d[xyz]'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, texto)
-            formulas.extend(matches)
-        
-        return list(set(formulas))
+        return list(varredura["formulas"])
     
     def salvar_json(self, arquivo_saida: str):
         """Salva questões em JSON"""
         try:
-            with open(arquivo_saida, 'w', encoding='utf-8') as f:
-                json.dump(self.questoes, f, ensure_ascii=False, indent=2)
+            if orjson is not None:
+                # orjson serializa em C e já emite UTF-8 sem escapar acentos
+                with open(arquivo_saida, 'wb') as f:
+                    f.write(orjson.dumps(self.questoes, option=orjson.OPT_INDENT_2))
+            else:
+                with open(arquivo_saida, 'w', encoding='utf-8') as f:
+                    json.dump(self.questoes, f, ensure_ascii=False, indent=2)
             print(f"\n✓ {len(self.questoes)} questões salvas em {arquivo_saida}")
         except Exception as e:
             print(f"❌ Erro ao salvar JSON: {e}")
@@ -336,6 +601,12 @@ class ExtractorUFRGS:
 if __name__ == "__main__":
     pdf_file = "UFRGS-2025.pdf"
     
+    # EXTRATOR_VERBOSE=1 mostra o progresso de cada página, questão e imagem
+    logging.basicConfig(
+        level=logging.INFO if os.environ.get("EXTRATOR_VERBOSE") else logging.WARNING,
+        format="%(message)s"
+    )
+    
     try:
         print(f"Processando {pdf_file}...\n")
         extractor = ExtractorUFRGS(pdf_file)
@@ -346,19 +617,12 @@ if __name__ == "__main__":
         print(f"\n{'='*60}")
         print(f"✓ Total de questões extraídas: {len(questoes)}")
         
-        # Contar por matéria
-        materias_count = {}
-        for q in questoes:
-            materia = q['materia']
-            materias_count[materia] = materias_count.get(materia, 0) + 1
-        
+        # Contagens acumuladas pelo extrator durante a extração
         print(f"\n✓ Questões por disciplina:")
-        for materia, count in sorted(materias_count.items()):
+        for materia, count in sorted(extractor.contagem_por_materia.items()):
             print(f"  - {materia}: {count}")
         
-        # Contar questões com imagem
-        questoes_com_imagem = [q for q in questoes if q['tem_imagem']]
-        print(f"\n✓ Questões com imagens: {len(questoes_com_imagem)}")
+        print(f"\n✓ Questões com imagens: {extractor.total_com_imagem}")
         
         # Listar números de questões
         numeros = [q['numero'] for q in questoes]